@@ -1,6 +1,7 @@
 import os
 
 import firebase_admin
+import httpx
 from firebase_admin import credentials, firestore, storage
 from google.cloud.firestore import Client as FirestoreClient
 from google.cloud.storage import Bucket
@@ -8,6 +9,7 @@ from google.cloud.storage import Bucket
 from backend.config import settings
 
 _app: firebase_admin.App | None = None
+_ml_client: httpx.AsyncClient | None = None
 
 
 def is_emulator() -> bool:
@@ -44,3 +46,26 @@ def get_firestore_client() -> FirestoreClient:
 def get_storage_bucket() -> Bucket:
     _init_firebase()
     return storage.bucket()
+
+
+def get_ml_client() -> httpx.AsyncClient:
+    """Shared ML service client; keeps connections alive across requests."""
+    global _ml_client
+    if _ml_client is None:
+        _ml_client = httpx.AsyncClient(
+            base_url=settings.ml_service_url,
+            timeout=30.0,
+            # HTTP/2 is negotiated via ALPN, so it only applies to an https ML URL
+            http2=True,
+            limits=httpx.Limits(
+                max_keepalive_connections=32, max_connections=64, keepalive_expiry=30.0
+            ),
+        )
+    return _ml_client
+
+
+async def close_ml_client() -> None:
+    global _ml_client
+    if _ml_client is not None:
+        await _ml_client.aclose()
+        _ml_client = None
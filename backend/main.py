@@ -3,7 +3,7 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from backend.dependencies import _init_firebase
+from backend.dependencies import _init_firebase, close_ml_client
 from backend.routers import health, ml, search
 
 
@@ -11,6 +11,7 @@ from backend.routers import health, ml, search
 async def lifespan(app: FastAPI):
     _init_firebase()
     yield
+    await close_ml_client()
 
 
 app = FastAPI(
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from urllib.parse import quote
 
@@ -9,8 +10,9 @@ from backend import dependencies
 from backend.config import settings
 from backend.models.common import GeoPointIn
 from backend.models.search import ProfileMatchCandidate, SearchResponse
-from backend.services import firestore_service
+from backend.services import embedding_cache, firestore_service
 from backend.utils.image import resize_for_embedding
+from backend.utils.vectors import l2_normalize_inplace
 
 router = APIRouter(prefix="/api/v1/search", tags=["search"])
 
@@ -25,7 +27,7 @@ def _photo_download_url(storage_path: str) -> str:
 
 
 @router.post("/match", response_model=SearchResponse)
-def search_match(
+async def search_match(
     files: list[UploadFile] = File(...),
     latitude: float = Form(...),
     longitude: float = Form(...),
@@ -34,65 +36,82 @@ def search_match(
     Ephemeral search: embed field worker face photos in-memory (no storage),
     match against profile embeddings, return up to 5 candidates.
     """
+    if not settings.enable_ml:
+        # Nothing to match against without embeddings; skip decoding and the ML round trip
+        return SearchResponse(
+            photos_processed=0,
+            embedding_size=0,
+            match_candidates=[],
+            location=GeoPointIn(latitude=latitude, longitude=longitude),
+        )
+
     db = dependencies.get_firestore_client()
+    ml_client = dependencies.get_ml_client()
+
+    # Pillow releases the GIL while decoding/resizing, so photos resize in parallel.
+    # Decode straight from each spooled upload rather than copying it into bytes first.
+    resized = await asyncio.gather(
+        *(asyncio.to_thread(resize_for_embedding, f.file) for f in files)
+    )
+
+    # One multipart request to /embed/batch instead of one round trip per photo
+    batch_files = [
+        ("files", (f"photo_{i}_224.jpg", data, "image/jpeg"))
+        for i, data in enumerate(resized)
+    ]
 
     embeddings: list[list[float]] = []
-    for i, upload_file in enumerate(files):
-        file_data = upload_file.file.read()
-        resized_data = resize_for_embedding(file_data)
-
-        try:
-            with httpx.Client(timeout=30.0) as client:
-                resp = client.post(
-                    f"{settings.ml_service_url}/embed",
-                    files={"file": (f"photo_{i}_224.jpg", resized_data, "image/jpeg")},
-                )
-            if resp.status_code == 200:
-                ml_result = resp.json()
-                embeddings.append(ml_result["embedding"])
-        except httpx.RequestError as e:
-            logging.warning("ML service unavailable for photo %d: %s", i, e)
+    try:
+        resp = await ml_client.post("/embed/batch", files=batch_files)
+        if resp.status_code == 200:
+            embeddings = resp.json()["embeddings"]
+        else:
+            logging.warning("ML batch embed failed with status %d", resp.status_code)
+    except httpx.RequestError as e:
+        logging.warning("ML service unavailable for %d photos: %s", len(batch_files), e)
 
-    averaged_embedding: list[float] | None = None
+    query_vec: np.ndarray | None = None
     if embeddings:
-        avg = np.mean(embeddings, axis=0)
-        norm = np.linalg.norm(avg)
-        if norm > 0:
-            avg = avg / norm
-        averaged_embedding = avg.tolist()
+        query_vec = l2_normalize_inplace(np.mean(np.asarray(embeddings, dtype=np.float32), axis=0))
 
     match_candidates: list[ProfileMatchCandidate] = []
-    if averaged_embedding is not None:
-        query_vec = np.array(averaged_embedding)
-        profiles = firestore_service.list_profiles_with_embeddings(db)
-
-        for profile in profiles:
-            other_emb = np.array(profile["embedding"])
-            other_norm = np.linalg.norm(other_emb)
-            if other_norm > 0:
-                other_emb = other_emb / other_norm
-            similarity = float(np.dot(query_vec, other_emb))
-
-            if similarity >= settings.similarity_threshold:
-                face_photo_id = profile.get("face_photo_id")
-                face_path = f"profiles/{profile['id']}/photos/{face_photo_id}.jpg" if face_photo_id else None
-                photo_url = _photo_download_url(face_path) if face_path else None
-                logging.info("[search] face_photo_id=%s  face_path=%s  photo_url=%s", face_photo_id, face_path, photo_url)
-                match_candidates.append(
-                    ProfileMatchCandidate(
-                        profile_id=profile["id"],
-                        name=profile.get("name", "Unknown"),
-                        similarity=round(similarity, 4),
-                        photo_signed_url=photo_url,
-                    )
-                )
+    if query_vec is not None:
+        # Usually a cache hit; a reload reads Firestore, so keep it off the event loop
+        profiles, matrix = await asyncio.to_thread(
+            embedding_cache.get_matrix,
+            lambda: firestore_service.iter_profiles_with_embeddings(db),
+        )
+
+        # Score every profile with a single matrix-vector product
+        similarities = matrix @ query_vec if profiles else np.empty(0, dtype=np.float32)
 
-        match_candidates.sort(key=lambda c: c.similarity, reverse=True)
-        match_candidates = match_candidates[: settings.max_match_results]
+        # Select the top-k above threshold without sorting every score
+        top = np.flatnonzero(similarities >= settings.similarity_threshold)
+        k = settings.max_match_results
+        if len(top) > k:
+            top = top[np.argpartition(-similarities[top], k - 1)[:k]]
+        top = top[np.argsort(-similarities[top], kind="stable")]
+
+        for idx in top:
+            profile = profiles[idx]
+            similarity = float(similarities[idx])
+            face_photo_id = profile.get("face_photo_id")
+            face_path = f"profiles/{profile['id']}/photos/{face_photo_id}.jpg" if face_photo_id else None
+            photo_url = _photo_download_url(face_path) if face_path else None
+            logging.info("[search] face_photo_id=%s  face_path=%s  photo_url=%s", face_photo_id, face_path, photo_url)
+            # Fields come from our own Firestore data; skip per-field validation
+            match_candidates.append(
+                ProfileMatchCandidate.model_construct(
+                    profile_id=profile["id"],
+                    name=profile.get("name", "Unknown"),
+                    similarity=round(similarity, 4),
+                    photo_signed_url=photo_url,
+                )
+            )
 
     return SearchResponse(
         photos_processed=len(embeddings),
-        embedding_size=len(averaged_embedding) if averaged_embedding else 0,
+        embedding_size=len(query_vec) if query_vec is not None else 0,
         match_candidates=match_candidates,
         location=GeoPointIn(latitude=latitude, longitude=longitude),
     )
@@ -0,0 +1,70 @@
+"""In-process cache of profile embeddings for search matching.
+
+Holds the profiles that have an embedding together with their L2-normalized
+float32 matrix, so /search/match does not re-read every profile from Firestore
+on each request. firestore_service keeps it current for writes made through this
+process: embedding updates patch the cached row in place (update_embedding), and
+deletes or changes to a cached name or face photo call invalidate(). Writes made
+elsewhere (mobile app, scripts) are picked up once the TTL expires.
+"""
+import threading
+import time
+from collections.abc import Callable, Iterable
+
+import numpy as np
+
+from backend.config import settings
+from backend.utils.vectors import l2_normalize_inplace
+
+_lock = threading.Lock()
+_profiles: list[dict] = []
+_matrix: np.ndarray | None = None
+_loaded_at: float = 0.0
+
+
+def get_matrix(load: Callable[[], Iterable[dict]]) -> tuple[list[dict], np.ndarray]:
+    """Return (profiles, normalized embedding matrix), reloading if stale.
+
+    load() yields the profiles to cache (each with an "embedding") and is only
+    called on a reload. Row i of the matrix is the unit-length embedding of profiles[i];
+    the "embedding" list is moved into the matrix, so the cached dicts do not carry it.
+    """
+    global _profiles, _matrix, _loaded_at
+    with _lock:
+        expired = time.monotonic() - _loaded_at > settings.embedding_cache_ttl_seconds
+        if _matrix is None or expired:
+            profiles = list(load())
+            if profiles:
+                matrix = np.asarray([p.pop("embedding") for p in profiles], dtype=np.float32)
+                l2_normalize_inplace(matrix)
+            else:
+                matrix = np.empty((0, 0), dtype=np.float32)
+            _profiles, _matrix, _loaded_at = profiles, matrix, time.monotonic()
+        return _profiles, _matrix
+
+
+def update_embedding(profile_id: str, embedding: np.ndarray) -> None:
+    """Swap in a profile's new unit-length embedding without reloading everything.
+
+    Profiles not yet cached (e.g. their first embedding) need their other fields
+    from Firestore, so those fall back to invalidate().
+    """
+    global _profiles, _matrix
+    with _lock:
+        if _matrix is None:
+            return
+        idx = next((i for i, p in enumerate(_profiles) if p["id"] == profile_id), None)
+        if idx is None:
+            _profiles, _matrix = [], None
+            return
+        # Copy-on-write: searches already holding the old arrays keep a consistent view
+        matrix = _matrix.copy()
+        matrix[idx] = embedding
+        _matrix = matrix
+
+
+def invalidate() -> None:
+    """Drop the cached matrix; the next get_matrix() reloads via its loader."""
+    global _profiles, _matrix
+    with _lock:
+        _profiles, _matrix = [], None
@@ -1,18 +1,24 @@
+import base64
+import binascii
 import uuid
+from collections.abc import Iterator
 from datetime import datetime, timezone
 
+import numpy as np
 from google.cloud.firestore import Client as FirestoreClient
-from google.cloud.firestore_v1 import FieldFilter
+from google.cloud.firestore_v1 import ArrayUnion, FieldFilter, transforms
+from google.cloud.firestore_v1._helpers import GeoPoint
 from google.cloud.firestore_v1.base_query import BaseQuery
 from google.cloud.firestore_v1.transaction import transactional
 
 from backend.models.common import GeoPointIn
+from backend.services import embedding_cache
+from backend.utils.vectors import l2_normalize_inplace
 
 
 def _geo_to_firestore(geo: GeoPointIn | None):
     if geo is None:
         return None
-    from google.cloud.firestore_v1._helpers import GeoPoint
     return GeoPoint(geo.latitude, geo.longitude)
 
 
@@ -23,47 +29,64 @@ def _geo_from_firestore(geo) -> GeoPointIn | None:
 
 
 def _now() -> datetime:
+    """Current UTC time. Write helpers accept `now` so batch callers can share one."""
     return datetime.now(timezone.utc)
 
 
+# Firestore rejects a WriteBatch with more than 500 writes
+_MAX_BATCH_WRITES = 500
+
+
 # --- Profiles ---
 
-def create_profile(db: FirestoreClient, data: dict) -> tuple[str, dict]:
-    now = _now()
+def create_profile(db: FirestoreClient, data: dict, now: datetime | None = None) -> tuple[str, dict]:
+    now = now or _now()
     profile_id = uuid.uuid4().hex
-    from google.cloud.firestore_v1 import transforms as _fs
     counter_ref = db.collection("counters").document("profiles")
-    counter_ref.set({"count": _fs.Increment(1)}, merge=True)
-    counter_snap = counter_ref.get()
-    profile_number = counter_snap.to_dict().get("count", 1) if counter_snap.exists else 1
-    doc_data = {
-        "name": f"Dog #{profile_number}",
-        "species": data["species"],
-        "sex": data.get("sex", "unknown"),
-        "breed": data.get("breed", ""),
-        "color_description": data.get("color_description", ""),
-        "distinguishing_features": data.get("distinguishing_features", ""),
-        "estimated_age_months": data.get("estimated_age_months"),
-        "location_found": _geo_to_firestore(
-            GeoPointIn(**data["location_found"]) if isinstance(data.get("location_found"), dict) else data.get("location_found")
-        ),
-        "notes": data.get("notes", ""),
-        "photo_count": 0,
-        "face_photo_id": None,
-        "has_embedding": False,
-        "profile_number": profile_number,
-        "created_at": now,
-        "updated_at": now,
-    }
-    db.collection("profiles").document(profile_id).set(doc_data)
+    profile_ref = db.collection("profiles").document(profile_id)
+    location_found = _geo_to_firestore(
+        GeoPointIn(**data["location_found"]) if isinstance(data.get("location_found"), dict) else data.get("location_found")
+    )
+
+    # Counter read, counter bump and profile write commit together in one transaction
+    @transactional
+    def _do_create(transaction):
+        counter_snap = counter_ref.get(transaction=transaction)
+        profile_number = (
+            counter_snap.to_dict().get("count", 0) if counter_snap.exists else 0
+        ) + 1
+        transaction.set(counter_ref, {"count": profile_number}, merge=True)
+        doc_data = {
+            "name": f"Dog #{profile_number}",
+            "species": data["species"],
+            "sex": data.get("sex", "unknown"),
+            "breed": data.get("breed", ""),
+            "color_description": data.get("color_description", ""),
+            "distinguishing_features": data.get("distinguishing_features", ""),
+            "estimated_age_months": data.get("estimated_age_months"),
+            "location_found": location_found,
+            "notes": data.get("notes", ""),
+            "photo_count": 0,
+            "face_photo_id": None,
+            "has_embedding": False,
+            "profile_number": profile_number,
+            "created_at": now,
+            "updated_at": now,
+        }
+        transaction.set(profile_ref, doc_data)
+        return doc_data
+
+    doc_data = _do_create(db.transaction())
     doc_data["id"] = profile_id
-    doc_data["location_found"] = _geo_from_firestore(doc_data["location_found"])
+    doc_data["location_found"] = _geo_from_firestore(location_found)
     return profile_id, doc_data
 
 
-def create_profile_from_intake(db: FirestoreClient, profile_id: str, data: dict) -> tuple[str, dict]:
+def create_profile_from_intake(
+    db: FirestoreClient, profile_id: str, data: dict, now: datetime | None = None,
+) -> tuple[str, dict]:
     """Create a profile with vet intake fields (used by POST /profiles/intake)."""
-    now = _now()
+    now = now or _now()
     counter_ref = db.collection("counters").document("profiles")
     profile_ref = db.collection("profiles").document(profile_id)
     location_found = (
@@ -118,12 +141,13 @@ def create_profile_from_intake(db: FirestoreClient, profile_id: str, data: dict)
             "updated_at": now,
         }
         transaction.set(profile_ref, doc_data)
+        return doc_data
 
     transaction = db.transaction()
-    _do_create(transaction)
+    doc_data = _do_create(transaction)
 
-    result = _profile_doc_to_dict(profile_ref.get())
-    return profile_id, result
+    # Build the result from what was written instead of reading the profile back
+    return profile_id, _profile_data_to_dict(profile_id, doc_data)
 
 
 def get_profile(db: FirestoreClient, profile_id: str) -> dict | None:
@@ -133,33 +157,68 @@ def get_profile(db: FirestoreClient, profile_id: str) -> dict | None:
     return _profile_doc_to_dict(doc)
 
 
+def _encode_cursor(created_at: datetime, doc_id: str) -> str:
+    """Opaque page cursor carrying the sort key of the last profile returned."""
+    raw = f"{created_at.isoformat()}|{doc_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def _decode_cursor(cursor: str) -> dict | None:
+    """Inverse of _encode_cursor; None for malformed cursors."""
+    try:
+        created_at, doc_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return {"created_at": datetime.fromisoformat(created_at), "__name__": doc_id}
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+# Every profile field except the embedding vector, which list views never show
+_PROFILE_LIST_FIELDS = [
+    "name", "species", "sex", "breed", "color_description", "distinguishing_features",
+    "estimated_age_months", "location_found", "notes", "photo_count", "face_photo_id",
+    "created_at", "updated_at", "model_version", "has_embedding", "sightings",
+    "last_seen_location", "last_seen_at", "age_estimate", "primary_color", "microchip_id",
+    "collar_tag_id", "neuter_status", "surgery_date", "rabies", "dhpp", "bite_risk",
+    "diseases", "clinic_name", "intake_location", "release_location", "profile_number",
+]
+
+
 def list_profiles(
     db: FirestoreClient,
     species: str | None = None,
     cursor: str | None = None,
     limit: int = 20,
 ) -> tuple[list[dict], str | None]:
-    query: BaseQuery = db.collection("profiles").order_by("created_at", direction="DESCENDING")
+    # Document ID breaks created_at ties so the cursor position is unambiguous
+    query: BaseQuery = (
+        db.collection("profiles")
+        .select(_PROFILE_LIST_FIELDS)
+        .order_by("created_at", direction="DESCENDING")
+        .order_by("__name__", direction="DESCENDING")
+    )
 
     if species:
         query = query.where(filter=FieldFilter("species", "==", species))
 
-    if cursor:
-        cursor_doc = db.collection("profiles").document(cursor).get()
-        if cursor_doc.exists:
-            query = query.start_after(cursor_doc)
+    # The cursor carries the sort key itself, so no extra read is needed to resume
+    cursor_values = _decode_cursor(cursor) if cursor else None
+    if cursor_values:
+        query = query.start_after(cursor_values)
 
     docs = list(query.limit(limit + 1).stream())
 
     next_cursor = None
     if len(docs) > limit:
-        next_cursor = docs[limit - 1].id
+        last = docs[limit - 1]
+        next_cursor = _encode_cursor(last.to_dict()["created_at"], last.id)
         docs = docs[:limit]
 
     return [_profile_doc_to_dict(d) for d in docs], next_cursor
 
 
-def update_profile(db: FirestoreClient, profile_id: str, data: dict) -> dict | None:
+def update_profile(
+    db: FirestoreClient, profile_id: str, data: dict, now: datetime | None = None,
+) -> dict | None:
     doc_ref = db.collection("profiles").document(profile_id)
     doc = doc_ref.get()
     if not doc.exists:
@@ -174,10 +233,13 @@ def update_profile(db: FirestoreClient, profile_id: str, data: dict) -> dict | N
                 )
             else:
                 update_data[key] = value
-    update_data["updated_at"] = _now()
+    update_data["updated_at"] = now or _now()
     doc_ref.update(update_data)
+    if "name" in update_data:
+        embedding_cache.invalidate()
 
-    return _profile_doc_to_dict(doc_ref.get())
+    # Merge locally instead of reading the document back
+    return _profile_data_to_dict(profile_id, {**doc.to_dict(), **update_data})
 
 
 def delete_profile(db: FirestoreClient, profile_id: str) -> bool:
@@ -186,12 +248,21 @@ def delete_profile(db: FirestoreClient, profile_id: str) -> bool:
     if not doc.exists:
         return False
 
-    # Delete photos subcollection
-    photos = doc_ref.collection("photos").stream()
-    for photo in photos:
-        photo.reference.delete()
-
-    doc_ref.delete()
+    # Delete photos subcollection and the profile in as few commits as possible.
+    # Only the document references are needed; an empty projection would return every field.
+    batch = db.batch()
+    pending = 0
+    for photo in doc_ref.collection("photos").select(["__name__"]).stream():
+        batch.delete(photo.reference)
+        pending += 1
+        if pending == _MAX_BATCH_WRITES:
+            batch.commit()
+            batch = db.batch()
+            pending = 0
+    batch.delete(doc_ref)
+    batch.commit()
+
+    embedding_cache.invalidate()
     return True
 
 
@@ -203,47 +274,55 @@ def add_photo_meta(
     photo_id: str,
     storage_path: str,
     angle: str | None = None,
+    now: datetime | None = None,
 ) -> dict:
-    now = _now()
+    now = now or _now()
     photo_data = {
         "storage_path": storage_path,
         "uploaded_at": now,
     }
     if angle:
         photo_data["angle"] = angle
-    db.collection("profiles").document(profile_id).collection("photos").document(
-        photo_id
-    ).set(photo_data)
 
     profile_update: dict = {"photo_count": firestore_increment(1), "updated_at": now}
     if angle == "face":
         profile_update["face_photo_id"] = photo_id
 
-    db.collection("profiles").document(profile_id).update(profile_update)
+    # Photo doc + profile counter commit together in one RPC
+    profile_ref = db.collection("profiles").document(profile_id)
+    batch = db.batch()
+    batch.set(profile_ref.collection("photos").document(photo_id), photo_data)
+    batch.update(profile_ref, profile_update)
+    batch.commit()
+    if angle == "face":
+        embedding_cache.invalidate()
 
     return {"photo_id": photo_id, "storage_path": storage_path, "uploaded_at": now, "angle": angle}
 
 
-def delete_photo_meta(db: FirestoreClient, profile_id: str, photo_id: str) -> str | None:
-    photo_ref = (
-        db.collection("profiles")
-        .document(profile_id)
-        .collection("photos")
-        .document(photo_id)
-    )
+def delete_photo_meta(
+    db: FirestoreClient, profile_id: str, photo_id: str, now: datetime | None = None,
+) -> str | None:
+    profile_ref = db.collection("profiles").document(profile_id)
+    photo_ref = profile_ref.collection("photos").document(photo_id)
     photo_doc = photo_ref.get()
     if not photo_doc.exists:
         return None
     photo_data = photo_doc.to_dict()
     storage_path = photo_data["storage_path"]
     was_face = photo_data.get("angle") == "face"
-    photo_ref.delete()
 
-    profile_update: dict = {"photo_count": firestore_increment(-1), "updated_at": _now()}
+    profile_update: dict = {"photo_count": firestore_increment(-1), "updated_at": now or _now()}
     if was_face:
         profile_update["face_photo_id"] = None
 
-    db.collection("profiles").document(profile_id).update(profile_update)
+    # Photo delete + profile counter commit together in one RPC
+    batch = db.batch()
+    batch.delete(photo_ref)
+    batch.update(profile_ref, profile_update)
+    batch.commit()
+    if was_face:
+        embedding_cache.invalidate()
 
     return storage_path
 
@@ -254,10 +333,12 @@ def get_profile_face_photo_path(db: FirestoreClient, profile_id: str) -> str | N
     Derives path from face_photo_id (O(1)). Falls back to first photo in subcollection
     for legacy profiles that may not have face_photo_id set.
     """
-    doc = db.collection("profiles").document(profile_id).get()
+    profile_ref = db.collection("profiles").document(profile_id)
+    # Read only the two fields needed, not the embedding and intake fields
+    doc = profile_ref.get(field_paths=["face_photo_id", "face_photo_path"])
     if not doc.exists:
         return None
-    data = doc.to_dict()
+    data = doc.to_dict() or {}
     face_photo_id = data.get("face_photo_id") or data.get("face_photo_path")
     if face_photo_id:
         # Legacy: face_photo_path stored the full path; new: face_photo_id is just the UUID
@@ -265,14 +346,7 @@ def get_profile_face_photo_path(db: FirestoreClient, profile_id: str) -> str | N
             return face_photo_id
         return f"profiles/{profile_id}/photos/{face_photo_id}.jpg"
     # Fallback: first photo in subcollection
-    photos = (
-        db.collection("profiles")
-        .document(profile_id)
-        .collection("photos")
-        .order_by("uploaded_at")
-        .limit(1)
-        .stream()
-    )
+    photos = profile_ref.collection("photos").order_by("uploaded_at").limit(1).stream()
     for p in photos:
         return f"profiles/{profile_id}/photos/{p.id}.jpg"
     return None
@@ -299,28 +373,50 @@ def get_profile_photos(db: FirestoreClient, profile_id: str) -> list[dict]:
 
 
 def firestore_increment(value: int):
-    from google.cloud.firestore_v1 import transforms
     return transforms.Increment(value)
 
 
 # --- Profile helpers (embeddings, sightings) ---
 
-def list_profiles_with_embeddings(db: FirestoreClient) -> list[dict]:
-    """Fetch only profiles that have a stored embedding (for search matching).
+_EMBEDDING_PAGE_SIZE = 500
+_EMBEDDING_FIELDS = ["name", "face_photo_id", "embedding"]
+
 
-    Uses has_embedding==True index filter instead of a full collection scan.
-    Profiles created before this field existed fall back to the Python filter.
+def iter_profiles_with_embeddings(db: FirestoreClient) -> Iterator[dict]:
+    """Yield only profiles that have a stored embedding (for search matching).
+
+    Uses has_embedding==True index filter instead of a full collection scan, and
+    pages through it by document ID (keyset cursor) so only one page is held at a time.
+    Only the fields search needs are fetched: {id, name, face_photo_id, embedding}.
     """
-    docs = (
+    base = (
         db.collection("profiles")
         .where(filter=FieldFilter("has_embedding", "==", True))
-        .stream()
+        .select(_EMBEDDING_FIELDS)
+        .order_by("__name__")
     )
-    return [_profile_doc_to_dict(doc) for doc in docs]
+    last_doc = None
+    while True:
+        query = base.start_after(last_doc) if last_doc is not None else base
+        docs = list(query.limit(_EMBEDDING_PAGE_SIZE).stream())
+        for doc in docs:
+            data = doc.to_dict() or {}
+            if not data.get("embedding"):
+                continue
+            yield {
+                "id": doc.id,
+                "name": data.get("name", ""),
+                "face_photo_id": data.get("face_photo_id"),
+                "embedding": data["embedding"],
+            }
+        if len(docs) < _EMBEDDING_PAGE_SIZE:
+            return
+        last_doc = docs[-1]
 
 
 def add_sighting_to_profile(
-    db: FirestoreClient, profile_id: str, latitude: float, longitude: float
+    db: FirestoreClient, profile_id: str, latitude: float, longitude: float,
+    now: datetime | None = None,
 ) -> dict | None:
     """Append a sighting entry to profile's sightings array and update last_seen."""
     doc_ref = db.collection("profiles").document(profile_id)
@@ -328,36 +424,48 @@ def add_sighting_to_profile(
     if not doc.exists:
         return None
 
-    now = _now()
+    now = now or _now()
     geo = _geo_to_firestore(GeoPointIn(latitude=latitude, longitude=longitude))
     entry = {"timestamp": now, "location": geo}
 
-    from google.cloud.firestore_v1 import ArrayUnion
-    doc_ref.update({
-        "sightings": ArrayUnion([entry]),
+    update_data = {
         "last_seen_location": geo,
         "last_seen_at": now,
         "updated_at": now,
-    })
-    return _profile_doc_to_dict(doc_ref.get())
+    }
+    data = doc.to_dict()
+    sightings = [*(data.get("sightings") or []), entry]
+    doc_ref.update({"sightings": ArrayUnion([entry]), **update_data})
+
+    # Merge locally instead of reading the document back
+    return _profile_data_to_dict(profile_id, {**data, **update_data, "sightings": sightings})
 
 
 def update_profile_embedding(
     db: FirestoreClient, profile_id: str, embedding: list[float], model_version: str,
+    now: datetime | None = None,
 ) -> None:
-    """Store embedding and model_version on a profile (from vet intake face photo)."""
+    """Store embedding and model_version on a profile (from vet intake face photo).
+
+    The embedding is stored L2-normalized so cosine similarity is a plain dot product.
+    """
+    vec = l2_normalize_inplace(np.asarray(embedding, dtype=np.float32))
     db.collection("profiles").document(profile_id).update({
-        "embedding": embedding,
+        "embedding": vec.tolist(),
         "model_version": model_version,
         "has_embedding": True,
-        "updated_at": _now(),
+        "updated_at": now or _now(),
     })
+    embedding_cache.update_embedding(profile_id, vec)
 
 
 # --- Helpers ---
 
 def _profile_doc_to_dict(doc) -> dict:
-    data = doc.to_dict()
+    return _profile_data_to_dict(doc.id, doc.to_dict())
+
+
+def _profile_data_to_dict(profile_id: str, data: dict) -> dict:
     sightings_raw = data.get("sightings") or []
     sightings = []
     for s in sightings_raw:
@@ -367,7 +475,7 @@ def _profile_doc_to_dict(doc) -> dict:
             geo = _geo_from_firestore(loc) if hasattr(loc, "latitude") else GeoPointIn(**loc)
             sightings.append({"timestamp": ts, "location": geo})
     return {
-        "id": doc.id,
+        "id": profile_id,
         "name": data.get("name", ""),
         "species": data.get("species", "dog"),
         "sex": data.get("sex", "unknown"),
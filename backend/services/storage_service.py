@@ -1,21 +1,35 @@
 from datetime import timedelta
+from itertools import islice
+from typing import BinaryIO
+from urllib.parse import quote
 
+from google.api_core.exceptions import NotFound, from_http_response
 from google.cloud.storage import Bucket
 
 from backend.config import settings
 from backend.dependencies import is_emulator
 
+# A GCS JSON batch request carries at most 100 sub-requests
+_DELETE_BATCH_SIZE = 100
 
-def upload_file(bucket: Bucket, storage_path: str, file_data: bytes, content_type: str = "image/jpeg") -> str:
+
+def upload_file(
+    bucket: Bucket, storage_path: str, file_data: bytes | BinaryIO, content_type: str = "image/jpeg",
+) -> str:
+    """Upload bytes, or stream a file-like (e.g. UploadFile.file) without buffering it first."""
     blob = bucket.blob(storage_path)
-    blob.upload_from_string(file_data, content_type=content_type)
+    if isinstance(file_data, (bytes, bytearray)):
+        blob.upload_from_string(file_data, content_type=content_type)
+    else:
+        blob.upload_from_file(file_data, content_type=content_type, rewind=True)
     return storage_path
 
 
 def generate_signed_url(bucket: Bucket, storage_path: str) -> str | None:
     if is_emulator():
         # Emulator doesn't support signed URLs; return a direct emulator URL instead.
-        return f"http://127.0.0.1:9199/v0/b/{bucket.name}/o/{storage_path.replace('/', '%2F')}?alt=media"
+        # Object names are one path segment: encode '/' and any other reserved character
+        return f"http://127.0.0.1:9199/v0/b/{bucket.name}/o/{quote(storage_path, safe='')}?alt=media"
     try:
         return bucket.blob(storage_path).generate_signed_url(
             expiration=timedelta(minutes=settings.signed_url_expiration_minutes),
@@ -26,22 +40,48 @@ def generate_signed_url(bucket: Bucket, storage_path: str) -> str | None:
 
 
 def download_file(bucket: Bucket, storage_path: str) -> bytes | None:
-    blob = bucket.blob(storage_path)
-    if not blob.exists():
+    # Let the request itself report a missing object instead of a separate exists() probe
+    try:
+        return bucket.blob(storage_path).download_as_bytes()
+    except NotFound:
         return None
-    return blob.download_as_bytes()
 
 
 def delete_file(bucket: Bucket, storage_path: str) -> bool:
-    blob = bucket.blob(storage_path)
-    if not blob.exists():
+    try:
+        bucket.blob(storage_path).delete()
+    except NotFound:
         return False
-    blob.delete()
     return True
 
 
 def delete_prefix(bucket: Bucket, prefix: str) -> int:
-    blobs = list(bucket.list_blobs(prefix=prefix))
-    for blob in blobs:
-        blob.delete()
-    return len(blobs)
+    """Delete every object under prefix and return how many this call deleted.
+
+    Objects already gone (404) are skipped and not counted; any other failed delete raises.
+    """
+    # Stream the listing a chunk at a time, fetching only object names
+    blobs = iter(bucket.list_blobs(prefix=prefix, fields="items(name),nextPageToken"))
+    deleted = 0
+    while chunk := list(islice(blobs, _DELETE_BATCH_SIZE)):
+        if is_emulator():
+            # The Storage emulator has no batch endpoint
+            for blob in chunk:
+                try:
+                    blob.delete()
+                except NotFound:
+                    continue
+                deleted += 1
+        else:
+            # One HTTP request per chunk. raise_exception=False keeps every sub-response
+            # (the default raises only the last failure); check each one here instead.
+            with bucket.client.batch(raise_exception=False) as batch:
+                for blob in chunk:
+                    blob.delete()
+            for response in batch._responses:
+                if response.status_code == 404:
+                    continue
+                if not 200 <= response.status_code < 300:
+                    raise from_http_response(response)
+                deleted += 1
+    return deleted
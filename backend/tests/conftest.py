@@ -1,14 +1,21 @@
 """Test fixtures with mocked Firebase services."""
-import uuid
+import contextlib
+import itertools
 from datetime import datetime, timezone
 from unittest.mock import MagicMock, patch
 
 import pytest
+import requests
 from fastapi.testclient import TestClient
+from google.api_core.exceptions import NotFound, from_http_response
 
 
 # --- Fake Firestore in-memory store ---
 
+# Auto-generated IDs for add(): deterministic and sortable, no urandom per insert
+_auto_ids = itertools.count(1)
+
+
 class FakeGeoPoint:
     def __init__(self, latitude, longitude):
         self.latitude = latitude
@@ -24,12 +31,15 @@ class FakeDocRef:
     def _key(self):
         return (self._collection_path, self.id)
 
-    def get(self):
+    def get(self, field_paths=None, transaction=None):
         data = self._store.get(self._key())
+        if data is not None and field_paths is not None:
+            data = {k: v for k, v in data.items() if k in field_paths}
         return FakeDocSnapshot(self.id, data, self._collection_path, self._store)
 
-    def set(self, data):
-        self._store[self._key()] = dict(data)
+    def set(self, data, merge=False):
+        existing = self._store.get(self._key(), {}) if merge else {}
+        self._store[self._key()] = {**existing, **data}
 
     def update(self, data):
         existing = self._store.get(self._key(), {})
@@ -70,10 +80,11 @@ class FakeDocSnapshot:
 
 
 class FakeQuery:
-    def __init__(self, store, collection_path, docs=None):
+    def __init__(self, store, collection_path, docs=None, orders=()):
         self._store = store
         self._collection_path = collection_path
         self._docs = docs
+        self._orders = orders
 
     def _get_docs(self):
         if self._docs is not None:
@@ -86,9 +97,14 @@ class FakeQuery:
 
     def order_by(self, field, direction=None):
         docs = self._get_docs()
-        reverse = direction == "DESCENDING" if direction else False
-        docs.sort(key=lambda d: d.to_dict().get(field, datetime.min.replace(tzinfo=timezone.utc)), reverse=reverse)
-        return FakeQuery(self._store, self._collection_path, docs)
+        orders = self._orders + ((field, direction == "DESCENDING"),)
+        # Stable sorts from the last key to the first give a multi-key ordering
+        for key, reverse in reversed(orders):
+            if key == "__name__":
+                docs.sort(key=lambda d: d.id, reverse=reverse)
+            else:
+                docs.sort(key=lambda d, k=key: d.to_dict().get(k, datetime.min.replace(tzinfo=timezone.utc)), reverse=reverse)
+        return FakeQuery(self._store, self._collection_path, docs, orders)
 
     def where(self, filter=None, **kwargs):
         docs = self._get_docs()
@@ -101,18 +117,32 @@ class FakeQuery:
             op = kwargs.get("op")
             value = kwargs.get("value")
         filtered = [d for d in docs if d.to_dict().get(field) == value]
-        return FakeQuery(self._store, self._collection_path, filtered)
+        return FakeQuery(self._store, self._collection_path, filtered, self._orders)
 
     def start_after(self, doc_snapshot):
         docs = self._get_docs()
-        idx = next((i for i, d in enumerate(docs) if d.id == doc_snapshot.id), -1)
+        # Accept a snapshot or a field-values dict keyed by "__name__"
+        doc_id = doc_snapshot["__name__"] if isinstance(doc_snapshot, dict) else doc_snapshot.id
+        idx = next((i for i, d in enumerate(docs) if d.id == doc_id), -1)
         if idx >= 0:
             docs = docs[idx + 1:]
-        return FakeQuery(self._store, self._collection_path, docs)
+        return FakeQuery(self._store, self._collection_path, docs, self._orders)
+
+    def select(self, field_paths):
+        docs = [
+            FakeDocSnapshot(
+                d.id,
+                {k: v for k, v in d._data.items() if k in field_paths},
+                self._collection_path,
+                self._store,
+            )
+            for d in self._get_docs()
+        ]
+        return FakeQuery(self._store, self._collection_path, docs, self._orders)
 
     def limit(self, n):
         docs = self._get_docs()[:n]
-        return FakeQuery(self._store, self._collection_path, docs)
+        return FakeQuery(self._store, self._collection_path, docs, self._orders)
 
     def stream(self):
         return iter(self._get_docs())
@@ -126,12 +156,51 @@ class FakeCollectionRef(FakeQuery):
         return FakeDocRef(self._store, self._collection_path, doc_id)
 
     def add(self, data):
-        doc_id = uuid.uuid4().hex
+        doc_id = f"doc_{next(_auto_ids):012d}"
         doc_ref = FakeDocRef(self._store, self._collection_path, doc_id)
         doc_ref.set(data)
         return None, doc_ref
 
 
+class FakeWriteBatch:
+    def __init__(self):
+        self._ops = []
+
+    def set(self, doc_ref, data, merge=False):
+        self._ops.append(lambda: doc_ref.set(data, merge=merge))
+
+    def update(self, doc_ref, data):
+        self._ops.append(lambda: doc_ref.update(data))
+
+    def delete(self, doc_ref):
+        self._ops.append(doc_ref.delete)
+
+    def commit(self):
+        for op in self._ops:
+            op()
+        self._ops = []
+
+
+class FakeTransaction(FakeWriteBatch):
+    """Buffers writes like a batch; the hooks below are what @transactional drives."""
+
+    _read_only = False
+    _max_attempts = 1
+    _id = b"fake-transaction"
+
+    def _clean_up(self):
+        self._ops = []
+
+    def _begin(self, retry_id=None):
+        pass
+
+    def _commit(self):
+        self.commit()
+
+    def _rollback(self):
+        self._ops = []
+
+
 class FakeFirestoreClient:
     def __init__(self):
         self._store = {}
@@ -139,6 +208,12 @@ class FakeFirestoreClient:
     def collection(self, name):
         return FakeCollectionRef(self._store, name)
 
+    def batch(self):
+        return FakeWriteBatch()
+
+    def transaction(self):
+        return FakeTransaction()
+
 
 # --- Fake Storage ---
 
@@ -150,19 +225,71 @@ class FakeBlob:
     def upload_from_string(self, data, content_type=None):
         self._bucket._blobs[self.name] = data
 
+    def upload_from_file(self, file_obj, content_type=None, rewind=False):
+        if rewind:
+            file_obj.seek(0)
+        self._bucket._blobs[self.name] = file_obj.read()
+
     def exists(self):
         return self.name in self._bucket._blobs
 
+    def download_as_bytes(self):
+        if self.name not in self._bucket._blobs:
+            raise NotFound(self.name)
+        return self._bucket._blobs[self.name]
+
     def delete(self):
-        self._bucket._blobs.pop(self.name, None)
+        status = self._bucket._delete_status.get(self.name)
+        if status is None:
+            status = 404 if self._bucket._blobs.pop(self.name, None) is None else 204
+        response = _fake_response(status, self.name)
+        batch = self._bucket.client.current_batch
+        if batch is not None:
+            # Like the real client: deferred until the batch finishes, never raised here
+            batch._responses.append(response)
+        elif status >= 300:
+            raise from_http_response(response)
 
     def generate_signed_url(self, expiration=None, method=None):
         return f"https://storage.example.com/signed/{self.name}"
 
 
+def _fake_response(status_code, name):
+    response = requests.Response()
+    response.status_code = status_code
+    response.request = requests.Request("DELETE", f"https://storage.example.com/{name}").prepare()
+    return response
+
+
+class FakeStorageBatch:
+    """Collects one sub-response per delete, as Batch does with raise_exception=False."""
+
+    def __init__(self, client):
+        self._client = client
+        self._responses = []
+
+    def __enter__(self):
+        self._client.current_batch = self
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._client.current_batch = None
+
+
+class FakeStorageClient:
+    def __init__(self):
+        self.current_batch = None
+
+    def batch(self, raise_exception=True):
+        return FakeStorageBatch(self)
+
+
 class FakeBucket:
     def __init__(self):
         self._blobs = {}
+        # Object name -> HTTP status that deleting it fails with
+        self._delete_status = {}
+        self.client = FakeStorageClient()
 
     def blob(self, name):
         return FakeBlob(name, self)
@@ -170,36 +297,51 @@ class FakeBucket:
     def exists(self):
         return True
 
-    def list_blobs(self, prefix=None):
+    def list_blobs(self, prefix=None, fields=None):
         return [FakeBlob(k, self) for k in self._blobs if k.startswith(prefix or "")]
 
 
 # --- Fixtures ---
 
-@pytest.fixture()
+@pytest.fixture(autouse=True)
+def _reset_embedding_cache():
+    from backend.services import embedding_cache
+    embedding_cache.invalidate()
+    yield
+    embedding_cache.invalidate()
+
+
+@pytest.fixture(scope="session")
 def fake_db():
     return FakeFirestoreClient()
 
 
-@pytest.fixture()
+@pytest.fixture(scope="session")
 def fake_bucket():
     return FakeBucket()
 
 
-@pytest.fixture()
+@pytest.fixture(autouse=True)
+def _reset_fakes(fake_db, fake_bucket):
+    # The fakes and client live for the whole session; isolate tests by emptying the stores
+    fake_db._store.clear()
+    fake_bucket._blobs.clear()
+    fake_bucket._delete_status.clear()
+
+
+@pytest.fixture(scope="session")
 def client(fake_db, fake_bucket):
-    with patch("backend.dependencies._init_firebase"):
-        with patch("backend.dependencies.get_firestore_client", return_value=fake_db):
-            with patch("backend.dependencies.get_storage_bucket", return_value=fake_bucket):
-                # Patch the GeoPoint import used in firestore_service
-                with patch(
-                    "google.cloud.firestore_v1._helpers.GeoPoint",
-                    FakeGeoPoint,
-                ):
-                    # Patch Increment
-                    with patch(
-                        "google.cloud.firestore_v1.transforms.Increment",
-                        FakeIncrement,
-                    ):
-                        from backend.main import app
-                        yield TestClient(app)
+    patches = [
+        patch("backend.dependencies._init_firebase"),
+        patch("backend.dependencies.get_firestore_client", return_value=fake_db),
+        patch("backend.dependencies.get_storage_bucket", return_value=fake_bucket),
+        # The GeoPoint name imported by firestore_service
+        patch("backend.services.firestore_service.GeoPoint", FakeGeoPoint),
+        patch("google.cloud.firestore_v1.transforms.Increment", FakeIncrement),
+    ]
+    # Entered once for the session, unwound in reverse order at teardown
+    with contextlib.ExitStack() as stack:
+        for p in patches:
+            stack.enter_context(p)
+        from backend.main import app
+        yield TestClient(app)
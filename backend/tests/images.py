@@ -0,0 +1,19 @@
+"""In-memory test images shared by the route tests."""
+import functools
+import io
+
+from PIL import Image
+
+
+@functools.lru_cache(maxsize=None)
+def _jpeg_bytes(width: int, height: int) -> bytes:
+    """Encode a solid-color JPEG once per size; bytes are immutable so callers can share them."""
+    img = Image.new("RGB", (width, height), color=(128, 64, 32))
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+def make_test_image(width: int = 640, height: int = 480) -> io.BytesIO:
+    """Create a valid JPEG image in memory for testing."""
+    return io.BytesIO(_jpeg_bytes(width, height))
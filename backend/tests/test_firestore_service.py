@@ -0,0 +1,107 @@
+"""Tests for firestore_service called directly against the fake Firestore client."""
+import base64
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+from backend.services import firestore_service
+
+_T0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def _seed_profile(db, doc_id, created_at=_T0, **fields):
+    data = {
+        "name": doc_id,
+        "species": "dog",
+        "created_at": created_at,
+        "updated_at": created_at,
+        "embedding": [0.1] * 32,
+        **fields,
+    }
+    db.collection("profiles").document(doc_id).set(data)
+
+
+def test_list_profiles_pages_through_created_at_ties(fake_db):
+    """Profiles sharing created_at are each returned exactly once across pages."""
+    for doc_id in ["a", "b", "c", "d", "e"]:
+        _seed_profile(fake_db, doc_id)
+    _seed_profile(fake_db, "newest", created_at=datetime(2025, 2, 1, tzinfo=timezone.utc))
+
+    seen = []
+    cursor = None
+    while True:
+        page, cursor = firestore_service.list_profiles(fake_db, cursor=cursor, limit=2)
+        seen.extend(p["id"] for p in page)
+        if cursor is None:
+            break
+
+    assert seen == ["newest", "e", "d", "c", "b", "a"]
+
+
+def test_list_profiles_malformed_cursor_starts_from_first_page(fake_db):
+    """An undecodable cursor is ignored rather than raising."""
+    for doc_id in ["a", "b", "c"]:
+        _seed_profile(fake_db, doc_id)
+
+    first_page, _ = firestore_service.list_profiles(fake_db, limit=2)
+    malformed = ["not-base64!!", *(base64.urlsafe_b64encode(raw).decode() for raw in [b"no-separator", b"not-a-date|a"])]
+    for cursor in malformed:
+        page, next_cursor = firestore_service.list_profiles(fake_db, cursor=cursor, limit=2)
+        assert [p["id"] for p in page] == [p["id"] for p in first_page]
+        assert next_cursor is not None
+
+
+def test_list_profiles_omits_embedding(fake_db):
+    """List results never carry the stored embedding vector."""
+    _seed_profile(fake_db, "rex", has_embedding=True)
+
+    page, _ = firestore_service.list_profiles(fake_db)
+
+    assert page[0]["has_embedding"] is True
+    assert page[0]["embedding"] is None
+
+
+@patch("backend.services.firestore_service._MAX_BATCH_WRITES", 2)
+def test_delete_profile_removes_photos_across_batches(fake_db):
+    """Photo subcollections larger than one batch are fully deleted with the profile."""
+    _seed_profile(fake_db, "rex")
+    _seed_profile(fake_db, "fido")
+    for profile_id, count in [("rex", 5), ("fido", 1)]:
+        photos = fake_db.collection("profiles").document(profile_id).collection("photos")
+        for i in range(count):
+            photos.document(f"p{i}").set({"storage_path": f"profiles/{profile_id}/photos/p{i}.jpg"})
+
+    assert firestore_service.delete_profile(fake_db, "rex") is True
+
+    rex_ref = fake_db.collection("profiles").document("rex")
+    assert not rex_ref.get().exists
+    assert list(rex_ref.collection("photos").stream()) == []
+    assert fake_db.collection("profiles").document("fido").get().exists
+    assert len(list(fake_db.collection("profiles").document("fido").collection("photos").stream())) == 1
+
+
+def test_create_profile_numbers_profiles_from_the_counter(fake_db):
+    """Each profile takes the next counter value as its number and default name."""
+    created = [firestore_service.create_profile(fake_db, {"species": "dog"})[1] for _ in range(3)]
+
+    assert [p["profile_number"] for p in created] == [1, 2, 3]
+    assert [p["name"] for p in created] == ["Dog #1", "Dog #2", "Dog #3"]
+    assert fake_db.collection("counters").document("profiles").get().to_dict() == {"count": 3}
+    for profile in created:
+        stored = fake_db.collection("profiles").document(profile["id"]).get().to_dict()
+        assert stored["profile_number"] == profile["profile_number"]
+
+
+def test_create_profile_from_intake_returns_stored_shape(fake_db):
+    """The intake result matches what get_profile later reads back."""
+    profile_id, created = firestore_service.create_profile_from_intake(
+        fake_db, "intake1", {"species": "dog", "microchip_id": "985112"},
+    )
+
+    assert created == firestore_service.get_profile(fake_db, profile_id)
+
+
+def test_profile_list_fields_cover_every_profile_field_but_embedding():
+    """The list projection stays in step with the fields _profile_data_to_dict returns."""
+    profile = firestore_service._profile_data_to_dict("x", {"created_at": _T0, "updated_at": _T0})
+
+    assert sorted(firestore_service._PROFILE_LIST_FIELDS) == sorted(profile.keys() - {"id", "embedding"})
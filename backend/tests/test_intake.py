@@ -1,17 +1,7 @@
 """Tests for POST /api/v1/profiles/intake endpoint."""
-import io
 from unittest.mock import patch
 
-from PIL import Image
-
-
-def _make_test_image(width: int = 640, height: int = 480) -> io.BytesIO:
-    """Create a valid JPEG image for testing."""
-    img = Image.new("RGB", (width, height), color=(128, 64, 32))
-    buf = io.BytesIO()
-    img.save(buf, format="JPEG")
-    buf.seek(0)
-    return buf
+from backend.tests.images import make_test_image
 
 
 @patch("backend.routers.profiles.httpx.Client")
@@ -24,8 +14,8 @@ def test_intake_creates_profile_with_photos(mock_httpx_cls, client):
         "model_version": "dogfacenet_v1",
     }
 
-    img1 = _make_test_image()
-    img2 = _make_test_image()
+    img1 = make_test_image()
+    img2 = make_test_image()
     resp = client.post(
         "/api/v1/profiles/intake",
         files=[
@@ -62,7 +52,7 @@ def test_intake_minimal_fields(mock_httpx_cls, client):
     mock_response.status_code = 200
     mock_response.json.return_value = {"embedding": [0.0] * 32, "model_version": "test"}
 
-    img = _make_test_image()
+    img = make_test_image()
     resp = client.post(
         "/api/v1/profiles/intake",
         files=[("files", ("face.jpg", img.getvalue(), "image/jpeg"))],
@@ -85,7 +75,7 @@ def test_intake_ml_failure_still_creates_profile(mock_httpx_cls, client):
     mock_response = mock_httpx_cls.return_value.__enter__.return_value.post
     mock_response.side_effect = httpx.RequestError("ML down")
 
-    img = _make_test_image()
+    img = make_test_image()
     resp = client.post(
         "/api/v1/profiles/intake",
         files=[("files", ("face.jpg", img.getvalue(), "image/jpeg"))],
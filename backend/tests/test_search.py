@@ -1,20 +1,33 @@
 """Tests for POST /api/v1/search/match endpoint."""
-import io
 import uuid
 from datetime import datetime, timezone
-from unittest.mock import patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
-from PIL import Image
 
+from backend.tests.images import make_test_image
 
-def _make_test_image(width: int = 640, height: int = 480) -> io.BytesIO:
-    """Create a valid JPEG image for testing."""
-    img = Image.new("RGB", (width, height), color=(128, 64, 32))
-    buf = io.BytesIO()
-    img.save(buf, format="JPEG")
-    buf.seek(0)
-    return buf
+
+def _mock_ml_post(mock_get_ml_client) -> AsyncMock:
+    """Attach an awaitable post() to the patched shared ML client."""
+    mock_post = AsyncMock(return_value=MagicMock(status_code=200))
+    mock_get_ml_client.return_value.post = mock_post
+    return mock_post
+
+
+def _mock_ml_embedding(mock_get_ml_client) -> None:
+    """Make the patched ML client return the same query embedding for every search."""
+    mock_response = _mock_ml_post(mock_get_ml_client).return_value
+    mock_response.json.return_value = {"embeddings": [[0.1] * 32], "model_version": "test"}
+
+
+def _search(client) -> list[dict]:
+    """POST one photo to /search/match and return the match candidates."""
+    return client.post(
+        "/api/v1/search/match",
+        files=[("files", ("photo.jpg", make_test_image().getvalue(), "image/jpeg"))],
+        data={"latitude": 34.0, "longitude": -118.0},
+    ).json()["match_candidates"]
 
 
 def _create_profile_with_embedding(client, fake_db, name: str = "Rex", embedding: list[float] | None = None):
@@ -46,21 +59,21 @@ def _create_profile_with_embedding(client, fake_db, name: str = "Rex", embedding
     return profile_id, emb
 
 
-@patch("backend.routers.search.httpx.Client")
-def test_search_match_returns_candidates(mock_httpx_cls, client, fake_db, fake_bucket):
+@patch("backend.dependencies.get_ml_client")
+def test_search_match_returns_candidates(mock_get_ml_client, client, fake_db, fake_bucket):
     """Search with valid photos returns match candidates when profiles have embeddings."""
     profile_id, emb = _create_profile_with_embedding(client, fake_db, "Rex")
 
     # Mock ML embed to return same embedding (perfect match)
-    mock_response = mock_httpx_cls.return_value.__enter__.return_value.post.return_value
+    mock_response = _mock_ml_post(mock_get_ml_client).return_value
     mock_response.status_code = 200
-    mock_response.json.return_value = {"embedding": emb, "model_version": "test"}
+    mock_response.json.return_value = {"embeddings": [emb], "model_version": "test"}
 
     # Upload a blob for the face photo path so generate_signed_url works
     face_path = f"profiles/{profile_id}/photos/face123.jpg"
     fake_bucket.blob(face_path).upload_from_string(b"fake", content_type="image/jpeg")
 
-    fake_image = _make_test_image()
+    fake_image = make_test_image()
     resp = client.post(
         "/api/v1/search/match",
         files=[("files", ("photo.jpg", fake_image.getvalue(), "image/jpeg"))],
@@ -82,14 +95,147 @@ def test_search_match_returns_candidates(mock_httpx_cls, client, fake_db, fake_b
     assert cand.get("photo_signed_url") is None or "profiles" in str(cand.get("photo_signed_url"))
 
 
-@patch("backend.routers.search.httpx.Client")
-def test_search_match_no_profiles_returns_empty(mock_httpx_cls, client):
+@patch("backend.dependencies.get_ml_client")
+def test_search_match_ranks_and_filters_by_threshold(mock_get_ml_client, client, fake_db):
+    """Candidates below the threshold are dropped; the rest are sorted by similarity."""
+    query = [1.0] + [0.0] * 31
+    close_id, _ = _create_profile_with_embedding(client, fake_db, "Close", [0.9, 0.3] + [0.0] * 30)
+    exact_id, _ = _create_profile_with_embedding(client, fake_db, "Exact", [2.0] + [0.0] * 31)
+    _create_profile_with_embedding(client, fake_db, "Far", [0.0, 1.0] + [0.0] * 30)
+
+    mock_response = _mock_ml_post(mock_get_ml_client).return_value
+    mock_response.status_code = 200
+    mock_response.json.return_value = {"embeddings": [query], "model_version": "test"}
+
+    resp = client.post(
+        "/api/v1/search/match",
+        files=[("files", ("photo.jpg", make_test_image().getvalue(), "image/jpeg"))],
+        data={"latitude": 34.0, "longitude": -118.0},
+    )
+
+    assert resp.status_code == 200
+    candidates = resp.json()["match_candidates"]
+    assert [c["profile_id"] for c in candidates] == [exact_id, close_id]
+    assert candidates[0]["similarity"] == 1.0
+    assert candidates[1]["similarity"] < 1.0
+
+
+@patch("backend.dependencies.get_ml_client")
+def test_search_match_caps_results_at_max(mock_get_ml_client, client, fake_db):
+    """Only the max_match_results best candidates are returned, best first."""
+    from backend.config import settings
+
+    query = [1.0] + [0.0] * 31
+    for i in range(settings.max_match_results + 3):
+        _create_profile_with_embedding(client, fake_db, f"Dog {i}", [1.0, i * 0.05] + [0.0] * 30)
+
+    mock_response = _mock_ml_post(mock_get_ml_client).return_value
+    mock_response.status_code = 200
+    mock_response.json.return_value = {"embeddings": [query], "model_version": "test"}
+
+    resp = client.post(
+        "/api/v1/search/match",
+        files=[("files", ("photo.jpg", make_test_image().getvalue(), "image/jpeg"))],
+        data={"latitude": 34.0, "longitude": -118.0},
+    )
+
+    candidates = resp.json()["match_candidates"]
+    assert [c["name"] for c in candidates] == [f"Dog {i}" for i in range(settings.max_match_results)]
+
+
+@patch("backend.services.firestore_service._EMBEDDING_PAGE_SIZE", 2)
+@patch("backend.dependencies.get_ml_client")
+def test_search_match_reads_embeddings_across_pages(mock_get_ml_client, client, fake_db):
+    """Profiles spanning several Firestore pages are all scored."""
+    for i in range(5):
+        _create_profile_with_embedding(client, fake_db, f"Dog {i}")
+
+    mock_response = _mock_ml_post(mock_get_ml_client).return_value
+    mock_response.json.return_value = {"embeddings": [[0.1] * 32], "model_version": "test"}
+
+    resp = client.post(
+        "/api/v1/search/match",
+        files=[("files", ("photo.jpg", make_test_image().getvalue(), "image/jpeg"))],
+        data={"latitude": 34.0, "longitude": -118.0},
+    )
+
+    assert len(resp.json()["match_candidates"]) == 5
+
+
+@patch("backend.dependencies.get_ml_client")
+def test_search_match_reuses_cached_embeddings(mock_get_ml_client, client, fake_db):
+    """Profile embeddings are read once and served from the cache until invalidated."""
+    from backend.services import embedding_cache
+
+    _mock_ml_embedding(mock_get_ml_client)
+    _create_profile_with_embedding(client, fake_db, "Rex")
+    assert len(_search(client)) == 1
+
+    # Written behind the cache's back: not visible until invalidation
+    _create_profile_with_embedding(client, fake_db, "Fido")
+    assert len(_search(client)) == 1
+
+    embedding_cache.invalidate()
+    assert len(_search(client)) == 2
+
+
+@patch("backend.dependencies.get_ml_client")
+def test_search_match_sees_embedding_update_without_reload(mock_get_ml_client, client, fake_db):
+    """update_profile_embedding patches the cached row instead of forcing a full reload."""
+    from backend.services import firestore_service
+
+    _mock_ml_embedding(mock_get_ml_client)
+    _create_profile_with_embedding(client, fake_db, "Rex")
+    fido_id, _ = _create_profile_with_embedding(client, fake_db, "Fido", [1.0] + [0.0] * 31)
+
+    with patch.object(
+        firestore_service,
+        "iter_profiles_with_embeddings",
+        wraps=firestore_service.iter_profiles_with_embeddings,
+    ) as mock_iter:
+        assert [c["name"] for c in _search(client)] == ["Rex"]
+
+        firestore_service.update_profile_embedding(fake_db, fido_id, [0.1] * 32, "test_v2")
+        assert sorted(c["name"] for c in _search(client)) == ["Fido", "Rex"]
+
+    mock_iter.assert_called_once()
+
+
+@patch("backend.dependencies.get_ml_client")
+def test_search_match_sees_rename_immediately(mock_get_ml_client, client, fake_db):
+    """update_profile invalidates the cache so candidates carry the new name."""
+    from backend.services import firestore_service
+
+    _mock_ml_embedding(mock_get_ml_client)
+    rex_id, _ = _create_profile_with_embedding(client, fake_db, "Rex")
+    assert [c["name"] for c in _search(client)] == ["Rex"]
+
+    firestore_service.update_profile(fake_db, rex_id, {"name": "Max"})
+    assert [c["name"] for c in _search(client)] == ["Max"]
+
+
+def test_embedding_cache_holds_vectors_only_in_matrix(client, fake_db):
+    """Cached profile dicts drop their embedding list once it is in the matrix."""
+    from backend.services import embedding_cache, firestore_service
+
+    rex_id, _ = _create_profile_with_embedding(client, fake_db, "Rex", [3.0, 4.0] + [0.0] * 30)
+
+    profiles, matrix = embedding_cache.get_matrix(
+        lambda: firestore_service.iter_profiles_with_embeddings(fake_db)
+    )
+
+    assert profiles == [{"id": rex_id, "name": "Rex", "face_photo_id": "face123"}]
+    assert matrix[0, :2].tolist() == pytest.approx([0.6, 0.8])
+
+
+@patch("backend.dependencies.get_ml_client")
+def test_search_match_no_profiles_returns_empty(mock_get_ml_client, client):
     """Search with no profiles in DB returns empty match_candidates."""
-    mock_response = mock_httpx_cls.return_value.__enter__.return_value.post.return_value
+    mock_response = _mock_ml_post(mock_get_ml_client).return_value
     mock_response.status_code = 200
-    mock_response.json.return_value = {"embedding": [0.1] * 32, "model_version": "test"}
+    mock_response.json.return_value = {"embeddings": [[0.1] * 32], "model_version": "test"}
 
-    fake_image = _make_test_image()
+    fake_image = make_test_image()
     resp = client.post(
         "/api/v1/search/match",
         files=[("files", ("photo.jpg", fake_image.getvalue(), "image/jpeg"))],
@@ -101,15 +247,15 @@ def test_search_match_no_profiles_returns_empty(mock_httpx_cls, client):
     assert resp.json()["photos_processed"] == 1
 
 
-@patch("backend.routers.search.httpx.Client")
-def test_search_match_ml_unavailable_returns_empty(mock_httpx_cls, client):
+@patch("backend.dependencies.get_ml_client")
+def test_search_match_ml_unavailable_returns_empty(mock_get_ml_client, client):
     """When ML service fails, search returns empty candidates."""
     import httpx
 
-    mock_response = mock_httpx_cls.return_value.__enter__.return_value.post
+    mock_response = _mock_ml_post(mock_get_ml_client)
     mock_response.side_effect = httpx.RequestError("Connection refused")
 
-    fake_image = _make_test_image()
+    fake_image = make_test_image()
     resp = client.post(
         "/api/v1/search/match",
         files=[("files", ("photo.jpg", fake_image.getvalue(), "image/jpeg"))],
@@ -122,9 +268,52 @@ def test_search_match_ml_unavailable_returns_empty(mock_httpx_cls, client):
     assert resp.json()["match_candidates"] == []
 
 
+@patch("backend.config.settings.enable_ml", False)
+@patch("backend.dependencies.get_ml_client")
+def test_search_match_ml_disabled_skips_ml_call(mock_get_ml_client, client):
+    """With enable_ml off, search returns no candidates without calling the ML service."""
+    fake_image = make_test_image()
+    resp = client.post(
+        "/api/v1/search/match",
+        files=[("files", ("photo.jpg", fake_image.getvalue(), "image/jpeg"))],
+        data={"latitude": 34.0, "longitude": -118.0},
+    )
+
+    assert resp.status_code == 200
+    assert resp.json()["photos_processed"] == 0
+    assert resp.json()["match_candidates"] == []
+    mock_get_ml_client.assert_not_called()
+
+
+@patch("backend.dependencies.get_ml_client")
+def test_search_match_batches_photos_into_one_ml_call(mock_get_ml_client, client):
+    """Multiple photos are embedded with a single /embed/batch request."""
+    mock_post = _mock_ml_post(mock_get_ml_client)
+    mock_post.return_value.status_code = 200
+    mock_post.return_value.json.return_value = {
+        "embeddings": [[0.1] * 32, [0.2] * 32, [0.3] * 32],
+        "model_version": "test",
+    }
+
+    resp = client.post(
+        "/api/v1/search/match",
+        files=[
+            ("files", (f"photo_{i}.jpg", make_test_image().getvalue(), "image/jpeg"))
+            for i in range(3)
+        ],
+        data={"latitude": 34.0, "longitude": -118.0},
+    )
+
+    assert resp.status_code == 200
+    assert resp.json()["photos_processed"] == 3
+    mock_post.assert_called_once()
+    assert mock_post.call_args.args[0] == "/embed/batch"
+    assert len(mock_post.call_args.kwargs["files"]) == 3
+
+
 def test_search_match_missing_latitude(client):
     """Missing latitude returns 422."""
-    fake_image = _make_test_image()
+    fake_image = make_test_image()
     resp = client.post(
         "/api/v1/search/match",
         files=[("files", ("photo.jpg", fake_image.getvalue(), "image/jpeg"))],
@@ -0,0 +1,60 @@
+"""Tests for storage_service called directly against the fake bucket."""
+from unittest.mock import patch
+
+import pytest
+from google.api_core.exceptions import ServiceUnavailable
+
+from backend.services import storage_service
+
+
+def test_download_file_returns_bytes_or_none(fake_bucket):
+    """A stored object downloads; a missing one yields None instead of raising."""
+    storage_service.upload_file(fake_bucket, "profiles/rex/photos/a.jpg", b"jpeg")
+
+    assert storage_service.download_file(fake_bucket, "profiles/rex/photos/a.jpg") == b"jpeg"
+    assert storage_service.download_file(fake_bucket, "profiles/rex/photos/missing.jpg") is None
+
+
+def test_delete_file_reports_whether_object_existed(fake_bucket):
+    """delete_file returns True for a deleted object and False for a missing one."""
+    storage_service.upload_file(fake_bucket, "profiles/rex/photos/a.jpg", b"jpeg")
+
+    assert storage_service.delete_file(fake_bucket, "profiles/rex/photos/a.jpg") is True
+    assert storage_service.delete_file(fake_bucket, "profiles/rex/photos/a.jpg") is False
+
+
+@pytest.mark.parametrize("emulator", [False, True])
+def test_delete_prefix_deletes_every_chunk_and_nothing_else(fake_bucket, emulator):
+    """More than one delete batch of objects is removed; other prefixes are untouched."""
+    for i in range(storage_service._DELETE_BATCH_SIZE + 50):
+        storage_service.upload_file(fake_bucket, f"profiles/rex/photos/{i}.jpg", b"jpeg")
+    storage_service.upload_file(fake_bucket, "profiles/rex2/photos/0.jpg", b"jpeg")
+
+    with patch("backend.services.storage_service.is_emulator", return_value=emulator):
+        deleted = storage_service.delete_prefix(fake_bucket, "profiles/rex/")
+
+    assert deleted == storage_service._DELETE_BATCH_SIZE + 50
+    assert list(fake_bucket._blobs) == ["profiles/rex2/photos/0.jpg"]
+
+
+@pytest.mark.parametrize("emulator", [False, True])
+def test_delete_prefix_skips_objects_already_gone(fake_bucket, emulator):
+    """An object that 404s on delete is neither counted nor treated as an error."""
+    for i in range(3):
+        storage_service.upload_file(fake_bucket, f"profiles/rex/photos/{i}.jpg", b"jpeg")
+    fake_bucket._delete_status["profiles/rex/photos/1.jpg"] = 404
+
+    with patch("backend.services.storage_service.is_emulator", return_value=emulator):
+        assert storage_service.delete_prefix(fake_bucket, "profiles/rex/") == 2
+
+
+@pytest.mark.parametrize("emulator", [False, True])
+def test_delete_prefix_raises_on_other_delete_failures(fake_bucket, emulator):
+    """A delete failing with anything but 404 surfaces instead of being reported as done."""
+    for i in range(3):
+        storage_service.upload_file(fake_bucket, f"profiles/rex/photos/{i}.jpg", b"jpeg")
+    fake_bucket._delete_status["profiles/rex/photos/1.jpg"] = 503
+
+    with patch("backend.services.storage_service.is_emulator", return_value=emulator):
+        with pytest.raises(ServiceUnavailable):
+            storage_service.delete_prefix(fake_bucket, "profiles/rex/")
@@ -1,20 +1,28 @@
 import io
+from typing import BinaryIO
 
 from PIL import Image
 
 from backend.config import settings
 
 
-def resize_for_embedding(file_data: bytes) -> bytes:
-    """Center-crop to square then resize to model input size (224x224 by default)."""
-    img = Image.open(io.BytesIO(file_data))
+def resize_for_embedding(file_data: bytes | BinaryIO) -> bytes:
+    """Center-crop to square then resize to model input size (224x224 by default).
+
+    Accepts raw bytes or a readable binary file (e.g. an UploadFile's spooled file).
+    """
+    img = Image.open(io.BytesIO(file_data) if isinstance(file_data, (bytes, bytearray)) else file_data)
+    # Let libjpeg decode at 1/2..1/8 scale while staying >= 2x the target size
+    target = settings.image_resize_size
+    img.draft("RGB", (target * 2, target * 2))
     img = img.convert("RGB")
     w, h = img.size
     short = min(w, h)
     left = (w - short) // 2
     top = (h - short) // 2
-    img = img.crop((left, top, left + short, top + short))
-    img = img.resize((settings.image_resize_size, settings.image_resize_size), Image.LANCZOS)
+    # Crop via resize's box argument so no intermediate cropped image is allocated
+    img = img.resize((target, target), Image.LANCZOS, box=(left, top, left + short, top + short))
     buf = io.BytesIO()
-    img.save(buf, format="JPEG", quality=85)
+    # Single-pass Huffman coding and 4:2:0 chroma; /embed only decodes this once
+    img.save(buf, format="JPEG", quality=85, optimize=False, subsampling=2)
     return buf.getvalue()
@@ -0,0 +1,13 @@
+import numpy as np
+
+
+def l2_normalize_inplace(x: np.ndarray) -> np.ndarray:
+    """L2-normalize a float vector, or each row of a matrix, in place.
+
+    All-zero vectors are left as zeros. Returns x for convenience.
+    """
+    sq = np.einsum("...i,...i->...", x, x)
+    inv = np.zeros_like(sq)
+    np.divide(1.0, np.sqrt(sq), out=inv, where=sq > 0)
+    x *= inv[..., None]
+    return x
@@ -53,6 +53,13 @@ class DogFaceNetEmbedder:
         self.model = model
         self.weights_path = weights_path
         self._validate_model()
+        # Graph-mode forward pass; avoids the per-call setup overhead of
+        # model.predict() for small batches. The unknown batch dimension keeps
+        # it to a single trace whatever the photo count.
+        self._infer = tf.function(
+            lambda x: self.model(x, training=False),
+            input_signature=[tf.TensorSpec([None, *self.INPUT_SHAPE], tf.float32)],
+        )
     
     @classmethod
     def load(cls, 
@@ -174,7 +181,7 @@ class DogFaceNetEmbedder:
         processed = preprocess_image(image, target_size=self.INPUT_SHAPE[:2])
         
         # Generate embedding
-        embedding = self.model.predict(processed, verbose=0)
+        embedding = self._infer(processed).numpy()
         
         # Extract single vector (remove batch dimension)
         embedding = embedding[0]
@@ -198,7 +205,7 @@ class DogFaceNetEmbedder:
         processed = preprocess_batch(images, target_size=self.INPUT_SHAPE[:2])
         
         # Generate embeddings
-        embeddings = self.model.predict(processed, verbose=0)
+        embeddings = self._infer(processed).numpy()
         
         # Ensure L2 normalization
         embeddings = normalize_embedding(embeddings)
@@ -13,7 +13,7 @@ from tensorflow.keras import Model
 from tensorflow.keras.layers import (
     Input, Conv2D, MaxPooling2D, Add, 
     GlobalAveragePooling2D, Activation, 
-    Dropout, Flatten, Dense, Lambda, 
+    Dropout, Dense, Lambda, 
     BatchNormalization
 )
 
@@ -35,6 +35,8 @@ def build_dogfacenet_model(input_shape=(224, 224, 3), emb_size=32):
     inputs = Input(shape=input_shape, name='input_image')
 
     # Initial convolution block
+    # Conv(relu) -> BN throughout matches the trained checkpoints; reordering to
+    # Conv -> BN -> ReLU loads the same weights but computes different embeddings
     x = Conv2D(16, (7, 7), strides=(2, 2), use_bias=False, 
                activation='relu', padding='same', name='conv_initial')(inputs)
     x = BatchNormalization(name='bn_initial')(x)
@@ -63,8 +65,8 @@ def build_dogfacenet_model(input_shape=(224, 224, 3), emb_size=32):
         x = Add(name=f'add_block{block_idx}_2')([residual, x])
 
     # Global pooling and embedding layers
+    # GAP already yields (batch, channels), so no Flatten is needed
     x = GlobalAveragePooling2D(name='global_pool')(x)
-    x = Flatten(name='flatten')(x)
     x = Dropout(0.5, name='dropout')(x)
     x = Dense(emb_size, use_bias=False, name='embedding')(x)
     
@@ -77,6 +79,23 @@ def build_dogfacenet_model(input_shape=(224, 224, 3), emb_size=32):
     return model
 
 
+def _split_triplets(y_pred):
+    """
+    Split interleaved [anchor, positive, negative, ...] embeddings.
+    
+    Reshapes to (n_triplets, 3, emb_size) and takes each column of the
+    middle axis.
+    
+    Args:
+        y_pred: Embeddings with shape (3 * n_triplets, emb_size)
+        
+    Returns:
+        Tuple of (anchor, positive, negative), each (n_triplets, emb_size)
+    """
+    triplets = tf.reshape(y_pred, (-1, 3, tf.shape(y_pred)[-1]))
+    return triplets[:, 0], triplets[:, 1], triplets[:, 2]
+
+
 def triplet_loss(y_true, y_pred, alpha=0.3):
     """
     Triplet loss function for training (included for checkpoint compatibility).
@@ -90,9 +109,7 @@ def triplet_loss(y_true, y_pred, alpha=0.3):
         Loss value
     """
     # Extract anchors, positives, and negatives
-    anchor = y_pred[0::3]
-    positive = y_pred[1::3]
-    negative = y_pred[2::3]
+    anchor, positive, negative = _split_triplets(y_pred)
     
     # Compute distances
     pos_dist = tf.reduce_sum(tf.square(anchor - positive), axis=-1)
@@ -116,9 +133,7 @@ def triplet_accuracy(y_true, y_pred, alpha=0.3):
     Returns:
         Accuracy metric
     """
-    anchor = y_pred[0::3]
-    positive = y_pred[1::3]
-    negative = y_pred[2::3]
+    anchor, positive, negative = _split_triplets(y_pred)
     
     pos_dist = tf.reduce_sum(tf.square(anchor - positive), axis=-1)
     neg_dist = tf.reduce_sum(tf.square(anchor - negative), axis=-1)
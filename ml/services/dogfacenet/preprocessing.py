@@ -103,14 +103,14 @@ def preprocess_batch(images: list, target_size=(224, 224)) -> np.ndarray:
     Returns:
         np.ndarray: Batch of preprocessed images with shape (N, 224, 224, 3)
     """
-    processed = []
-    
-    for img in images:
-        processed_img = preprocess_image(img, target_size)
-        # Remove batch dimension added by preprocess_image
-        processed.append(processed_img[0])
-    
-    return np.array(processed)
+    # Preallocate the float32 batch once instead of stacking a list of arrays
+    processed = np.empty((len(images), target_size[0], target_size[1], 3), dtype=np.float32)
+
+    for i, img in enumerate(images):
+        # preprocess_image adds a batch dimension; write the single image in place
+        processed[i] = preprocess_image(img, target_size)[0]
+
+    return processed
 
 
 def normalize_embedding(embedding: np.ndarray) -> np.ndarray:
@@ -5,6 +5,7 @@ Migrate existing profiles to the current schema.
 Backfills:
   - face_photo_id: UUID of the face photo (replaces face_photo_path)
   - has_embedding: True if profile has a non-empty embedding array
+  - embedding: rescaled to unit length (search scores are raw dot products)
 
 Also migrates legacy face_photo_path (full storage path) → face_photo_id (UUID only).
 
@@ -13,10 +14,13 @@ Run from project root. Uses .env for credentials.
 import sys
 from pathlib import Path
 
+import numpy as np
+
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
 from backend.dependencies import get_firestore_client
 from backend.services.firestore_service import _now
+from backend.utils.vectors import l2_normalize_inplace
 
 
 def _get_face_photo_id_from_subcollection(db, profile_id: str) -> str | None:
@@ -48,6 +52,7 @@ def main():
         return 1
 
     profiles = db.collection("profiles").stream()
+    now = _now()  # one migration timestamp for every touched profile
     updated = 0
     skipped = 0
 
@@ -75,11 +80,21 @@ def main():
             emb = data.get("embedding")
             updates["has_embedding"] = bool(emb and len(emb) > 0)
 
+        # Embeddings written before write-time normalization may not be unit length
+        emb = data.get("embedding")
+        if emb:
+            unit = l2_normalize_inplace(np.array(emb, dtype=np.float32))
+            if not np.allclose(unit, emb):
+                updates["embedding"] = unit.tolist()
+
         if updates:
-            updates["updated_at"] = _now()
+            updates["updated_at"] = now
             db.collection("profiles").document(profile_id).update(updates)
             updated += 1
-            print(f"  {profile_id}: {updates}")
+            # Log the rescale, not the vector itself
+            shown = {k: v for k, v in updates.items() if k != "embedding"}
+            rescaled = " (embedding rescaled)" if "embedding" in updates else ""
+            print(f"  {profile_id}: {shown}{rescaled}")
         else:
             skipped += 1
 